@@ -0,0 +1,25 @@
+"""Command line utilities
+
+Usage:
+    python -m app.cli init-db
+"""
+import argparse
+
+from app.database import init_db
+
+
+def main() -> None:
+    """Parse the command line and run the requested command"""
+    parser = argparse.ArgumentParser(prog="python -m app.cli")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("init-db", help="Create all database tables")
+
+    args = parser.parse_args()
+
+    if args.command == "init-db":
+        init_db()
+        print("Database tables created")
+
+
+if __name__ == "__main__":
+    main()
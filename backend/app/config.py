@@ -13,11 +13,22 @@ class Settings(BaseSettings):
     MYSQL_PASSWORD: str
     MYSQL_DATABASE: str = "chatbot_db"
 
+    # Connection pools. The sync and async engines each keep their own pool,
+    # so one worker can open up to the sum of all four limits (40 here).
+    # Keep workers * that sum below MySQL max_connections (default 151).
+    DB_POOL_SIZE: int = 10  # Sync engine
+    DB_MAX_OVERFLOW: int = 10
+    ASYNC_DB_POOL_SIZE: int = 10  # Async engine (chat routes)
+    ASYNC_DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: int = 10  # Seconds to wait for a free connection
+    DB_ECHO: bool = False  # Log every SQL statement
+
     # Security
     SECRET_KEY: str  # For JWT tokens (min 32 chars)
     ENCRYPTION_KEY: str  # For API key encryption (32 bytes base64)
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24 * 7  # 7 days
+    BCRYPT_ROUNDS: int = 12  # Password hashing cost (lower, e.g. 10, in development)
 
     # Application
     ENVIRONMENT: str = "development"
@@ -27,7 +38,9 @@ class Settings(BaseSettings):
     CORS_ORIGINS: List[str] = ["http://localhost:3000", "http://localhost:5173"]
 
     # Rate Limiting
-    RATE_LIMIT_PER_MINUTE: int = 20
+    RATE_LIMIT_PER_MINUTE: int = 20  # Chat requests per user
+    AUTH_RATE_LIMIT: str = "5/minute"  # Login/register attempts per client IP
+    RATE_LIMIT_STORAGE_URI: str = "memory://"  # e.g. "redis://localhost:6379/0" to share across workers
 
     model_config = SettingsConfigDict(
         env_file=".env",
@@ -43,6 +56,14 @@ class Settings(BaseSettings):
             f"@{self.MYSQL_HOST}:{self.MYSQL_PORT}/{self.MYSQL_DATABASE}"
         )
 
+    @property
+    def async_database_url(self) -> str:
+        """Construct async database URL for SQLAlchemy (asyncmy driver)"""
+        return (
+            f"mysql+asyncmy://{self.MYSQL_USER}:{self.MYSQL_PASSWORD}"
+            f"@{self.MYSQL_HOST}:{self.MYSQL_PORT}/{self.MYSQL_DATABASE}"
+        )
+
 
 # Global settings instance
 settings = Settings()
@@ -1,8 +1,9 @@
 """Database connection and session management"""
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, Connection
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, Session
-from typing import Generator
+from typing import AsyncGenerator, Generator
 
 from app.config import settings
 
@@ -11,7 +12,11 @@ engine = create_engine(
     settings.database_url,
     pool_pre_ping=True,  # Verify connections before using
     pool_recycle=3600,   # Recycle connections after 1 hour
-    echo=settings.DEBUG  # Log SQL queries in debug mode
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_timeout=settings.DB_POOL_TIMEOUT,
+    pool_use_lifo=True,  # Reuse the most recent connections, let idle ones expire
+    echo=settings.DB_ECHO  # Log SQL queries (opt-in)
 )
 
 # Session factory
@@ -21,6 +26,27 @@ SessionLocal = sessionmaker(
     bind=engine
 )
 
+# Async engine for routes that talk to the database while awaiting other I/O
+# (e.g. streaming chat responses). It has its own pool, sized separately so
+# the two engines together stay within the MySQL connection budget.
+async_engine = create_async_engine(
+    settings.async_database_url,
+    pool_pre_ping=True,
+    pool_recycle=3600,
+    pool_size=settings.ASYNC_DB_POOL_SIZE,
+    max_overflow=settings.ASYNC_DB_MAX_OVERFLOW,
+    pool_timeout=settings.DB_POOL_TIMEOUT,
+    pool_use_lifo=True,
+    echo=settings.DB_ECHO
+)
+
+# Async session factory (objects stay usable after commit)
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    autoflush=False,
+    expire_on_commit=False
+)
+
 # Base class for models
 Base = declarative_base()
 
@@ -41,6 +67,31 @@ def get_db() -> Generator[Session, None, None]:
         db.close()
 
 
+def get_ro_conn() -> Generator[Connection, None, None]:
+    """
+    Dependency for read-only routes to get a plain Core connection.
+
+    Skips Session setup and identity-map bookkeeping; use with select()
+    and read rows via Row._mapping.
+    """
+    with engine.connect() as conn:
+        yield conn
+
+
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    """
+    Dependency for async FastAPI routes to get an async database session.
+
+    Usage:
+        @app.get("/users")
+        async def get_users(db: AsyncSession = Depends(get_async_db)):
+            result = await db.execute(select(User))
+            return result.scalars().all()
+    """
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
 def init_db() -> None:
-    """Create all tables in the database"""
+    """Create all tables in the database (run via `python -m app.cli init-db`)"""
     Base.metadata.create_all(bind=engine)
@@ -1,10 +1,13 @@
 """FastAPI application entry point"""
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from slowapi import _rate_limit_exceeded_handler
+from slowapi.errors import RateLimitExceeded
 
 from app.config import settings
-from app.database import init_db
+from app.rate_limit import limiter
 from app.routes import auth, chat, conversations
+from app.services.ai_service import close_http_client
 
 # Create FastAPI app
 app = FastAPI(
@@ -14,6 +17,10 @@ app = FastAPI(
     debug=settings.DEBUG
 )
 
+# Rate limiting
+app.state.limiter = limiter
+app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
+
 # Configure CORS
 app.add_middleware(
     CORSMiddleware,
@@ -24,10 +31,10 @@ app.add_middleware(
 )
 
 
-@app.on_event("startup")
-async def startup_event():
-    """Initialize database on startup"""
-    init_db()
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Release the shared AI provider HTTP connections"""
+    await close_http_client()
 
 
 @app.get("/")
@@ -53,3 +60,11 @@ def health_check():
 app.include_router(auth.router, prefix="/auth", tags=["Authentication"])
 app.include_router(chat.router, prefix="/chat", tags=["Chat"])
 app.include_router(conversations.router, prefix="/conversations", tags=["Conversations"])
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    # uvloop ships with uvicorn[standard]; pinning it makes a missing install
+    # fail loudly instead of silently falling back to the asyncio loop
+    uvicorn.run("app.main:app", loop="uvloop")
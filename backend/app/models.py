@@ -1,5 +1,6 @@
 """SQLAlchemy database models"""
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Enum, UniqueConstraint
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, UniqueConstraint, Index, CheckConstraint
+from sqlalchemy.dialects import mysql
 from sqlalchemy.orm import relationship
 from datetime import datetime
 import enum
@@ -7,14 +8,14 @@ import enum
 from app.database import Base
 
 
-class ProviderEnum(str, enum.Enum):
-    """AI Provider options"""
+class ProviderEnum(enum.StrEnum):
+    """AI Provider options (stored as plain strings)"""
     OPENAI = "openai"
     ANTHROPIC = "anthropic"
 
 
-class MessageRoleEnum(str, enum.Enum):
-    """Message role options"""
+class MessageRoleEnum(enum.StrEnum):
+    """Message role options (stored as plain strings)"""
     USER = "user"
     ASSISTANT = "assistant"
     SYSTEM = "system"
@@ -41,16 +42,35 @@ class Conversation(Base):
     __tablename__ = "conversations"
 
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     title = Column(String(255))
     agent_type = Column(String(50), nullable=False)  # "langgraph", "openai_assistant", "langchain", etc.
-    provider = Column(Enum(ProviderEnum), nullable=False)  # "openai" or "anthropic"
+    provider = Column(String(20), nullable=False)  # "openai" or "anthropic"
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+    # Microsecond precision on MySQL (plain DATETIME truncates to the second),
+    # so edits within the same second still change the conversation ETags
+    updated_at = Column(
+        DateTime().with_variant(mysql.DATETIME(fsp=6), "mysql"),
+        default=datetime.utcnow,
+        onupdate=datetime.utcnow,
+        nullable=False
+    )
 
     # Relationships
     user = relationship("User", back_populates="conversations")
-    messages = relationship("Message", back_populates="conversation", cascade="all, delete-orphan")
+    messages = relationship(
+        "Message",
+        back_populates="conversation",
+        cascade="all, delete-orphan",
+        order_by="Message.created_at"
+    )
+
+    # Index for listing a user's conversations by most recent update
+    # (also serves lookups by user_id alone)
+    __table_args__ = (
+        Index("ix_conv_user_updated", "user_id", "updated_at"),
+        CheckConstraint("provider IN ('openai', 'anthropic')", name="ck_conversations_provider"),
+    )
 
 
 class Message(Base):
@@ -59,13 +79,19 @@ class Message(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     conversation_id = Column(Integer, ForeignKey("conversations.id", ondelete="CASCADE"), nullable=False, index=True)
-    role = Column(Enum(MessageRoleEnum), nullable=False)
+    role = Column(String(16), nullable=False)
     content = Column(Text, nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
 
     # Relationships
     conversation = relationship("Conversation", back_populates="messages")
 
+    # Index for fetching the latest messages of a conversation
+    __table_args__ = (
+        Index("ix_messages_conv_created", "conversation_id", "created_at"),
+        CheckConstraint("role IN ('user', 'assistant', 'system')", name="ck_messages_role"),
+    )
+
 
 class ApiKey(Base):
     """Encrypted API keys for AI providers"""
@@ -73,15 +99,16 @@ class ApiKey(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
-    provider = Column(Enum(ProviderEnum), nullable=False)
-    encrypted_key = Column(Text, nullable=False)  # Encrypted with Fernet
+    provider = Column(String(20), nullable=False)
+    encrypted_key = Column(String(1024), nullable=False)  # Fernet token (ASCII base64url)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
 
     # Relationships
     user = relationship("User", back_populates="api_keys")
 
-    # Constraints: one key per provider per user
+    # Constraints: one key per provider per user, known providers only
     __table_args__ = (
         UniqueConstraint("user_id", "provider", name="unique_user_provider"),
+        CheckConstraint("provider IN ('openai', 'anthropic')", name="ck_api_keys_provider"),
     )
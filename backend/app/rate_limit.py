@@ -0,0 +1,24 @@
+"""Rate limiting shared by all routers (slowapi)"""
+from slowapi import Limiter
+from slowapi.util import get_remote_address
+from starlette.requests import Request
+
+from app.config import settings
+
+# Limits are counted in RATE_LIMIT_STORAGE_URI (in-memory by default,
+# Redis in multi-worker deployments)
+limiter = Limiter(
+    key_func=get_remote_address,
+    storage_uri=settings.RATE_LIMIT_STORAGE_URI
+)
+
+
+def user_or_ip_key(request: Request) -> str:
+    """
+    Rate limit key: the authenticated user's id, otherwise the client IP.
+
+    The user id is set by get_current_user, so all of a user's tokens share
+    one budget and no credentials end up in the limiter storage keys.
+    """
+    user_id = getattr(request.state, "user_id", None)
+    return f"user:{user_id}" if user_id is not None else get_remote_address(request)
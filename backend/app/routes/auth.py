@@ -1,20 +1,32 @@
 """Authentication routes - register, login, API key management"""
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, EmailStr, Field
 from datetime import datetime, timedelta
 from jose import JWTError, jwt
+from cachetools import TTLCache
 import bcrypt
+import rfernet
+import threading
+import time
 
 from app.database import get_db
 from app.models import User, ApiKey, ProviderEnum
 from app.config import settings
+from app.rate_limit import limiter
 from app.services.encryption import encrypt_api_key, decrypt_api_key
+from app.services.ai_service import AgentFactory
 
 router = APIRouter()
 security = HTTPBearer()
 
+# Short-lived caches for authenticated requests:
+# token -> (user_id, exp timestamp) and user_id -> detached User
+_token_cache: TTLCache = TTLCache(maxsize=10000, ttl=60)
+_user_cache: TTLCache = TTLCache(maxsize=10000, ttl=60)
+_auth_cache_lock = threading.Lock()
+
 
 # Pydantic schemas
 class UserRegister(BaseModel):
@@ -35,7 +47,7 @@ class Token(BaseModel):
 
 class ApiKeyCreate(BaseModel):
     provider: ProviderEnum
-    api_key: str
+    api_key: str = Field(max_length=512)  # Keeps the Fernet token within encrypted_key
 
 
 class ApiKeyResponse(BaseModel):
@@ -48,9 +60,24 @@ class ApiKeyResponse(BaseModel):
 
 
 # Auth helpers
+def _evict_api_key(encrypted_key: str) -> None:
+    """Drop cached plaintexts and AI services for a replaced or deleted key"""
+    try:
+        AgentFactory.evict(decrypt_api_key(encrypted_key))
+    except rfernet.DecryptionError:
+        pass  # Never decrypted (e.g. corrupt row), so nothing was built with it
+    decrypt_api_key.cache_clear()
+
+
 def hash_password(password: str) -> str:
-    """Hash a password using bcrypt"""
-    return bcrypt.hashpw(password.encode(), bcrypt.gensalt()).decode()
+    """
+    Hash a password using bcrypt.
+
+    The cost factor comes from settings.BCRYPT_ROUNDS. Existing hashes keep
+    the cost they were created with, so it can be changed (or the scheme
+    migrated, e.g. to argon2-cffi's PasswordHasher) without breaking logins.
+    """
+    return bcrypt.hashpw(password.encode(), bcrypt.gensalt(settings.BCRYPT_ROUNDS)).decode()
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
@@ -66,34 +93,61 @@ def create_access_token(user_id: int) -> str:
 
 
 def get_current_user(
+    request: Request,
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db: Session = Depends(get_db)
 ) -> User:
-    """Dependency to get current authenticated user from JWT token"""
+    """
+    Dependency to get current authenticated user from JWT token.
+
+    Also records the user id on request.state for per-user rate limiting.
+    """
     token = credentials.credentials
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
     )
 
-    try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        user_id: str = payload.get("sub")
-        if user_id is None:
+    # Reuse a recently verified token instead of decoding it again
+    with _auth_cache_lock:
+        cached = _token_cache.get(token)
+
+    if cached is not None and cached[1] > time.time():
+        user_id = cached[0]
+    else:
+        try:
+            payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+            sub: str = payload.get("sub")
+            if sub is None:
+                raise credentials_exception
+        except JWTError:
             raise credentials_exception
-    except JWTError:
-        raise credentials_exception
 
-    user = db.query(User).filter(User.id == int(user_id)).first()
+        user_id = int(sub)
+        with _auth_cache_lock:
+            _token_cache[token] = (user_id, payload.get("exp", 0))
+
+    with _auth_cache_lock:
+        user = _user_cache.get(user_id)
+
     if user is None:
-        raise credentials_exception
+        user = db.query(User).filter(User.id == user_id).first()
+        if user is None:
+            raise credentials_exception
+
+        # Detach so commits in the route don't expire the cached instance
+        db.expunge(user)
+        with _auth_cache_lock:
+            _user_cache[user_id] = user
 
+    request.state.user_id = user_id
     return user
 
 
 # Routes
 @router.post("/register", response_model=Token, status_code=status.HTTP_201_CREATED)
-def register(user_data: UserRegister, db: Session = Depends(get_db)):
+@limiter.limit(settings.AUTH_RATE_LIMIT)
+def register(request: Request, user_data: UserRegister, db: Session = Depends(get_db)):
     """Register a new user"""
     # Check if user exists
     existing_user = db.query(User).filter(User.email == user_data.email).first()
@@ -119,7 +173,8 @@ def register(user_data: UserRegister, db: Session = Depends(get_db)):
 
 
 @router.post("/login", response_model=Token)
-def login(user_data: UserLogin, db: Session = Depends(get_db)):
+@limiter.limit(settings.AUTH_RATE_LIMIT)
+def login(request: Request, user_data: UserLogin, db: Session = Depends(get_db)):
     """Login and get access token"""
     user = db.query(User).filter(User.email == user_data.email).first()
     if not user or not verify_password(user_data.password, user.hashed_password):
@@ -158,9 +213,11 @@ def create_api_key(
 
     if existing_key:
         # Update existing key
+        old_encrypted_key = existing_key.encrypted_key
         existing_key.encrypted_key = encrypt_api_key(key_data.api_key)
         existing_key.updated_at = datetime.utcnow()
         db.commit()
+        _evict_api_key(old_encrypted_key)
         db.refresh(existing_key)
         return existing_key
     else:
@@ -203,6 +260,8 @@ def delete_api_key(
             detail=f"No API key found for provider {provider}"
         )
 
+    encrypted_key = api_key.encrypted_key
     db.delete(api_key)
     db.commit()
+    _evict_api_key(encrypted_key)
     return None
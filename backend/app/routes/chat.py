@@ -1,10 +1,16 @@
 """Chat routes - send messages and stream responses"""
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from fastapi.responses import StreamingResponse
-from sqlalchemy.orm import Session
+from sqlalchemy import and_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import raiseload
 from pydantic import BaseModel
+from datetime import datetime
+import anyio
 
-from app.database import get_db
+from app.config import settings
+from app.database import AsyncSessionLocal, get_async_db
+from app.rate_limit import limiter, user_or_ip_key
 from app.models import User, Conversation, Message, ApiKey, MessageRoleEnum
 from app.routes.auth import get_current_user
 from app.services.encryption import decrypt_api_key
@@ -18,11 +24,32 @@ class ChatRequest(BaseModel):
     message: str
 
 
+CHAT_RATE_LIMIT = f"{settings.RATE_LIMIT_PER_MINUTE}/minute"
+
+
+def _sse_event(data: str) -> str:
+    """Format data as a Server-Sent Event (one data: line per text line)"""
+    return "".join(f"data: {line}\n" for line in data.split("\n")) + "\n"
+
+
+async def _save_turn(db: AsyncSession, conversation_id: int, messages: list[Message]) -> None:
+    """Save a chat turn's messages and bump the conversation's updated_at in one commit"""
+    db.add_all(messages)
+    await db.execute(
+        update(Conversation).where(
+            Conversation.id == conversation_id
+        ).values(updated_at=datetime.utcnow())
+    )
+    await db.commit()
+
+
 @router.post("/stream")
+@limiter.limit(CHAT_RATE_LIMIT, key_func=user_or_ip_key)
 async def chat_stream(
-    request: ChatRequest,
+    request: Request,
+    chat_request: ChatRequest,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Send a message and stream the AI response.
@@ -35,23 +62,32 @@ async def chat_stream(
     5. Streams the response back
     6. Saves both user message and AI response to database
     """
-    # Get conversation and verify ownership
-    conversation = db.query(Conversation).filter(
-        Conversation.id == request.conversation_id,
-        Conversation.user_id == current_user.id
-    ).first()
+    # Get conversation (verifying ownership) and the user's API key for its
+    # provider in a single round trip; raiseload guards against accidental
+    # lazy loads on the hot path
+    result = await db.execute(
+        select(Conversation, ApiKey).options(
+            raiseload("*")
+        ).outerjoin(
+            ApiKey,
+            and_(
+                ApiKey.user_id == Conversation.user_id,
+                ApiKey.provider == Conversation.provider
+            )
+        ).where(
+            Conversation.id == chat_request.conversation_id,
+            Conversation.user_id == current_user.id
+        )
+    )
+    row = result.first()
 
-    if not conversation:
+    if row is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Conversation not found"
         )
 
-    # Get user's API key for this provider
-    api_key_record = db.query(ApiKey).filter(
-        ApiKey.user_id == current_user.id,
-        ApiKey.provider == conversation.provider
-    ).first()
+    conversation, api_key_record = row
 
     if not api_key_record:
         raise HTTPException(
@@ -63,30 +99,33 @@ async def chat_stream(
     api_key = decrypt_api_key(api_key_record.encrypted_key)
 
     # Get conversation history (last 20 messages for context)
-    history_messages = db.query(Message).filter(
-        Message.conversation_id == request.conversation_id
-    ).order_by(Message.created_at.desc()).limit(20).all()
+    result = await db.execute(
+        select(Message.role, Message.content).where(
+            Message.conversation_id == chat_request.conversation_id
+        ).order_by(Message.created_at.desc()).limit(20)
+    )
+    history_messages = result.all()
 
     # Convert to format expected by AI service
     history = [
-        {"role": msg.role.value, "content": msg.content}
+        {"role": msg.role, "content": msg.content}
         for msg in reversed(history_messages)
     ]
 
-    # Save user message
+    # User message is persisted together with the assistant reply; stamp it
+    # now so it keeps sorting before the reply
     user_message = Message(
-        conversation_id=request.conversation_id,
+        conversation_id=chat_request.conversation_id,
         role=MessageRoleEnum.USER,
-        content=request.message
+        content=chat_request.message,
+        created_at=datetime.utcnow()
     )
-    db.add(user_message)
-    db.commit()
 
     # Create AI service
     try:
         service = AgentFactory.create(
             agent_type=conversation.agent_type,
-            provider=conversation.provider.value,
+            provider=conversation.provider,
             api_key=api_key
         )
     except ValueError as e:
@@ -98,72 +137,91 @@ async def chat_stream(
     # Stream response
     async def generate():
         """Generate streaming response and save to database"""
-        full_response = ""
+        # Messages to persist in one commit once the stream ends
+        new_messages = [user_message]
+        parts: list[str] = []
 
         try:
-            async for chunk in service.chat(request.message, history):
-                full_response += chunk
+            # Services already coalesce tokens into larger chunks
+            async for chunk in service.chat(chat_request.message, history):
+                parts.append(chunk)
                 # Send as Server-Sent Events format
-                yield f"data: {chunk}\n\n"
+                yield _sse_event(chunk)
 
             # Signal end of stream
-            yield "data: [DONE]\n\n"
+            yield _sse_event("[DONE]")
 
-            # Save assistant message after streaming completes
-            assistant_message = Message(
-                conversation_id=request.conversation_id,
+            new_messages.append(Message(
+                conversation_id=chat_request.conversation_id,
                 role=MessageRoleEnum.ASSISTANT,
-                content=full_response
-            )
-            db.add(assistant_message)
-            db.commit()
+                content="".join(parts)
+            ))
 
         except Exception as e:
             error_msg = f"Error: {str(e)}"
-            yield f"data: {error_msg}\n\n"
+            yield _sse_event(error_msg)
             # Still save error as message for debugging
-            assistant_message = Message(
-                conversation_id=request.conversation_id,
+            new_messages.append(Message(
+                conversation_id=chat_request.conversation_id,
                 role=MessageRoleEnum.ASSISTANT,
                 content=f"[Error: {str(e)}]"
-            )
-            db.add(assistant_message)
-            db.commit()
+            ))
+
+        finally:
+            # The request's session is released once the response starts,
+            # so persist with a session owned by the stream itself. A client
+            # disconnect cancels this generator; the shield keeps the save
+            # (then just the user message) from being cancelled with it.
+            with anyio.CancelScope(shield=True):
+                async with AsyncSessionLocal() as stream_db:
+                    await _save_turn(stream_db, chat_request.conversation_id, new_messages)
 
     return StreamingResponse(
         generate(),
-        media_type="text/event-stream"
+        media_type="text/event-stream",
+        headers={"X-Accel-Buffering": "no"}  # Disable proxy buffering (nginx)
     )
 
 
 @router.post("/message")
+@limiter.limit(CHAT_RATE_LIMIT, key_func=user_or_ip_key)
 async def chat_message(
-    request: ChatRequest,
+    request: Request,
+    chat_request: ChatRequest,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Send a message and get complete response (non-streaming).
 
     Use this for simpler clients that don't support SSE.
     """
-    # Get conversation and verify ownership
-    conversation = db.query(Conversation).filter(
-        Conversation.id == request.conversation_id,
-        Conversation.user_id == current_user.id
-    ).first()
+    # Get conversation (verifying ownership) and the user's API key for its
+    # provider in a single round trip; raiseload guards against accidental
+    # lazy loads on the hot path
+    result = await db.execute(
+        select(Conversation, ApiKey).options(
+            raiseload("*")
+        ).outerjoin(
+            ApiKey,
+            and_(
+                ApiKey.user_id == Conversation.user_id,
+                ApiKey.provider == Conversation.provider
+            )
+        ).where(
+            Conversation.id == chat_request.conversation_id,
+            Conversation.user_id == current_user.id
+        )
+    )
+    row = result.first()
 
-    if not conversation:
+    if row is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Conversation not found"
         )
 
-    # Get user's API key
-    api_key_record = db.query(ApiKey).filter(
-        ApiKey.user_id == current_user.id,
-        ApiKey.provider == conversation.provider
-    ).first()
+    conversation, api_key_record = row
 
     if not api_key_record:
         raise HTTPException(
@@ -174,29 +232,32 @@ async def chat_message(
     api_key = decrypt_api_key(api_key_record.encrypted_key)
 
     # Get history
-    history_messages = db.query(Message).filter(
-        Message.conversation_id == request.conversation_id
-    ).order_by(Message.created_at.desc()).limit(20).all()
+    result = await db.execute(
+        select(Message.role, Message.content).where(
+            Message.conversation_id == chat_request.conversation_id
+        ).order_by(Message.created_at.desc()).limit(20)
+    )
+    history_messages = result.all()
 
     history = [
-        {"role": msg.role.value, "content": msg.content}
+        {"role": msg.role, "content": msg.content}
         for msg in reversed(history_messages)
     ]
 
-    # Save user message
+    # User message is persisted together with the assistant reply; stamp it
+    # now so it keeps sorting before the reply
     user_message = Message(
-        conversation_id=request.conversation_id,
+        conversation_id=chat_request.conversation_id,
         role=MessageRoleEnum.USER,
-        content=request.message
+        content=chat_request.message,
+        created_at=datetime.utcnow()
     )
-    db.add(user_message)
-    db.commit()
 
     # Create AI service
     try:
         service = AgentFactory.create(
             agent_type=conversation.agent_type,
-            provider=conversation.provider.value,
+            provider=conversation.provider,
             api_key=api_key
         )
     except ValueError as e:
@@ -206,25 +267,37 @@ async def chat_message(
         )
 
     # Collect full response
-    full_response = ""
+    parts: list[str] = []
     try:
-        async for chunk in service.chat(request.message, history):
-            full_response += chunk
+        async for chunk in service.chat(chat_request.message, history):
+            parts.append(chunk)
     except Exception as e:
+        # Still save error as message for debugging, batched with the user message
+        error_message = Message(
+            conversation_id=chat_request.conversation_id,
+            role=MessageRoleEnum.ASSISTANT,
+            content=f"[Error: {str(e)}]"
+        )
+        await _save_turn(db, chat_request.conversation_id, [user_message, error_message])
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=str(e)
         )
+    except anyio.get_cancelled_exc_class():
+        # Request cancelled mid-call (e.g. on shutdown): keep the user message
+        with anyio.CancelScope(shield=True):
+            await _save_turn(db, chat_request.conversation_id, [user_message])
+        raise
+
+    full_response = "".join(parts)
 
-    # Save assistant message
+    # Save user and assistant messages in a single commit
     assistant_message = Message(
-        conversation_id=request.conversation_id,
+        conversation_id=chat_request.conversation_id,
         role=MessageRoleEnum.ASSISTANT,
         content=full_response
     )
-    db.add(assistant_message)
-    db.commit()
-    db.refresh(assistant_message)
+    await _save_turn(db, chat_request.conversation_id, [user_message, assistant_message])
 
     return {
         "message": full_response,
@@ -1,11 +1,14 @@
 """Conversations routes - manage chat conversations"""
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from sqlalchemy import Connection, func, select
+from sqlalchemy.orm import Session, raiseload, selectinload
 from pydantic import BaseModel
 from datetime import datetime
 from typing import Optional
+import hashlib
+import msgspec
 
-from app.database import get_db
+from app.database import get_db, get_ro_conn
 from app.models import User, Conversation, Message, ProviderEnum, MessageRoleEnum
 from app.routes.auth import get_current_user
 
@@ -47,6 +50,30 @@ class ConversationWithMessages(BaseModel):
     messages: list[MessageResponse]
 
 
+# msgspec mirrors of the response schemas, used to encode list endpoints
+class ConversationOut(msgspec.Struct):
+    id: int
+    title: Optional[str]
+    agent_type: str
+    provider: str
+    created_at: datetime
+    updated_at: datetime
+    message_count: Optional[int] = None
+
+
+class MessageOut(msgspec.Struct):
+    id: int
+    role: str
+    content: str
+    created_at: datetime
+
+
+def _make_etag(*parts) -> str:
+    """Build a quoted ETag value from the given parts"""
+    digest = hashlib.sha1(":".join(str(part) for part in parts).encode()).hexdigest()
+    return f'"{digest}"'
+
+
 # Routes
 @router.post("/", response_model=ConversationResponse, status_code=status.HTTP_201_CREATED)
 def create_conversation(
@@ -80,55 +107,92 @@ def create_conversation(
     return conversation
 
 
-@router.get("/", response_model=list[ConversationResponse])
+# Rows are encoded with msgspec; the response model only documents the schema
+@router.get(
+    "/",
+    response_model=None,
+    responses={200: {"model": list[ConversationResponse]}}
+)
 def list_conversations(
+    request: Request,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    conn: Connection = Depends(get_ro_conn),
     skip: int = 0,
     limit: int = 50
 ):
     """
     Get all conversations for the current user.
 
-    Returns conversations ordered by most recently updated.
+    Returns conversations ordered by most recently updated. Supports
+    conditional requests: a matching If-None-Match gets a 304.
     """
-    conversations = db.query(Conversation).filter(
-        Conversation.user_id == current_user.id
-    ).order_by(
-        Conversation.updated_at.desc()
-    ).offset(skip).limit(limit).all()
-
-    # Add message count to each conversation
-    result = []
-    for conv in conversations:
-        message_count = db.query(Message).filter(
-            Message.conversation_id == conv.id
-        ).count()
+    # Cheap fingerprint of the user's conversations. updated_at changes on
+    # every chat turn and rename; the newest message id is included too so
+    # message_count stays fresh even if two writes share a timestamp.
+    last_updated, conversation_count, last_message_id = conn.execute(
+        select(
+            func.max(Conversation.updated_at),
+            func.count(Conversation.id.distinct()),
+            func.max(Message.id)
+        ).outerjoin(
+            Message, Message.conversation_id == Conversation.id
+        ).where(
+            Conversation.user_id == current_user.id
+        )
+    ).one()
 
-        conv_dict = {
-            "id": conv.id,
-            "title": conv.title,
-            "agent_type": conv.agent_type,
-            "provider": conv.provider,
-            "created_at": conv.created_at,
-            "updated_at": conv.updated_at,
-            "message_count": message_count
-        }
-        result.append(conv_dict)
+    etag = _make_etag(
+        current_user.id, last_updated, conversation_count, last_message_id, skip, limit
+    )
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
+    # Fetch conversations with their message count in a single query
+    rows = conn.execute(
+        select(
+            Conversation.id,
+            Conversation.title,
+            Conversation.agent_type,
+            Conversation.provider,
+            Conversation.created_at,
+            Conversation.updated_at,
+            func.count(Message.id).label("message_count")
+        ).outerjoin(
+            Message, Message.conversation_id == Conversation.id
+        ).where(
+            Conversation.user_id == current_user.id
+        ).group_by(
+            Conversation.id
+        ).order_by(
+            Conversation.updated_at.desc()
+        ).offset(skip).limit(limit)
+    )
 
-    return result
+    return Response(
+        msgspec.json.encode([ConversationOut(**row._mapping) for row in rows]),
+        media_type="application/json",
+        headers={"ETag": etag}
+    )
 
 
 @router.get("/{conversation_id}", response_model=ConversationWithMessages)
 def get_conversation(
     conversation_id: int,
+    request: Request,
+    response: Response,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """
     Get a specific conversation with all its messages.
+
+    Supports conditional requests: a matching If-None-Match gets a 304.
     """
-    conversation = db.query(Conversation).filter(
+    # Messages are loaded alongside the conversation (ordered by created_at)
+    conversation = db.query(Conversation).options(
+        selectinload(Conversation.messages),
+        raiseload("*")
+    ).filter(
         Conversation.id == conversation_id,
         Conversation.user_id == current_user.id
     ).first()
@@ -139,13 +203,16 @@ def get_conversation(
             detail="Conversation not found"
         )
 
-    messages = db.query(Message).filter(
-        Message.conversation_id == conversation_id
-    ).order_by(Message.created_at.asc()).all()
+    etag = _make_etag(
+        conversation.id, conversation.updated_at, conversation.title, len(conversation.messages)
+    )
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+    response.headers["ETag"] = etag
 
     return {
         "conversation": conversation,
-        "messages": messages
+        "messages": conversation.messages
     }
 
 
@@ -204,7 +271,11 @@ def delete_conversation(
     return None
 
 
-@router.get("/{conversation_id}/messages", response_model=list[MessageResponse])
+@router.get(
+    "/{conversation_id}/messages",
+    response_model=None,
+    responses={200: {"model": list[MessageResponse]}}
+)
 def get_messages(
     conversation_id: int,
     current_user: User = Depends(get_current_user),
@@ -229,10 +300,18 @@ def get_messages(
             detail="Conversation not found"
         )
 
-    messages = db.query(Message).filter(
+    messages = db.query(
+        Message.id,
+        Message.role,
+        Message.content,
+        Message.created_at
+    ).filter(
         Message.conversation_id == conversation_id
     ).order_by(
         Message.created_at.asc()
     ).offset(skip).limit(limit).all()
 
-    return messages
+    return Response(
+        msgspec.json.encode([MessageOut(**msg._mapping) for msg in messages]),
+        media_type="application/json"
+    )
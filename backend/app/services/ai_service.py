@@ -1,11 +1,130 @@
 """AI service with agent factory pattern"""
 from typing import AsyncGenerator, Optional
 from abc import ABC, abstractmethod
-
+import asyncio
+import functools
+import hashlib
+import json
+import threading
+
+from cachetools import LRUCache
+import httpx
+import numpy as np
+from openai import AsyncOpenAI
+from anthropic import AsyncAnthropic
 from langchain_openai import ChatOpenAI
 from langchain_anthropic import ChatAnthropic
 from langgraph.prebuilt import create_react_agent
-from langchain.schema import HumanMessage, AIMessage, SystemMessage
+from langchain_core.messages import HumanMessage, AIMessage, SystemMessage
+
+
+# HTTP connection pool shared by all provider clients, so connections (and
+# their TLS sessions) are reused across services and users. With HTTP/2,
+# concurrent streams to the same provider multiplex over one connection.
+_HTTP_CLIENT = httpx.AsyncClient(
+    http2=True,
+    limits=httpx.Limits(max_connections=200, max_keepalive_connections=100)
+)
+
+
+async def close_http_client() -> None:
+    """Close the shared HTTP client (call on application shutdown)"""
+    await _HTTP_CLIENT.aclose()
+
+
+async def _coalesce(
+    stream: AsyncGenerator[str, None],
+    max_ms: float = 20,
+    max_chars: int = 64
+) -> AsyncGenerator[str, None]:
+    """
+    Merge small streamed chunks into larger ones.
+
+    Chunks are buffered and yielded together once max_chars are pending or
+    max_ms have passed since the last yield, whichever comes first; the
+    deadline is enforced with a timer, so no chunk is held back longer than
+    max_ms even if the stream stalls. A chunk arriving after a pause goes
+    out immediately while token bursts are batched. If the stream fails,
+    the buffered chunks are yielded before the error is raised.
+
+    The stream is read in the caller's task while nothing is buffered; only
+    reads that race a flush deadline run in a separate task.
+    """
+    loop = asyncio.get_running_loop()
+    buffer: list[str] = []
+    size = 0
+    last_yield = loop.time()
+    deadline: Optional[float] = None  # Flush time of the buffered chunks
+    # Read of the next chunk racing the deadline; kept across flushes, since
+    # cancelling it would cancel the underlying stream
+    pending: Optional[asyncio.Future] = None
+    try:
+        while True:
+            chunk: Optional[str] = None
+            if pending is None and not buffer:
+                # Nothing to flush, so no deadline to race: read in this task,
+                # keeping the context (contextvars) the stream runs in
+                try:
+                    chunk = await stream.__anext__()
+                except StopAsyncIteration:
+                    break
+            else:
+                if pending is None:
+                    pending = asyncio.ensure_future(stream.__anext__())
+                # No deadline if a read outlived a flush and nothing is buffered
+                timeout = None if deadline is None else max(deadline - loop.time(), 0)
+                done, _ = await asyncio.wait({pending}, timeout=timeout)
+                if done:
+                    read, pending = pending, None
+                    try:
+                        chunk = read.result()
+                    except StopAsyncIteration:
+                        break
+                    except Exception:
+                        # Deliver the text received before the error, then raise
+                        if buffer:
+                            yield "".join(buffer)
+                        raise
+
+            if chunk is not None:
+                buffer.append(chunk)
+                size += len(chunk)
+                if deadline is None:
+                    deadline = last_yield + max_ms / 1000
+                if size < max_chars and loop.time() < deadline:
+                    continue
+
+            # max_chars reached or deadline passed
+            yield "".join(buffer)
+            buffer.clear()
+            size = 0
+            last_yield = loop.time()
+            deadline = None
+
+        if buffer:
+            yield "".join(buffer)
+    finally:
+        if pending is not None:
+            pending.cancel()
+            await asyncio.wait({pending})
+        await stream.aclose()
+
+
+def _coalesced(chat):
+    """Decorator coalescing the chunks streamed by a service's chat method"""
+    @functools.wraps(chat)
+    async def wrapper(self, message: str, history: list = None) -> AsyncGenerator[str, None]:
+        async for text in _coalesce(chat(self, message, history)):
+            yield text
+    return wrapper
+
+
+# History role -> LangChain message class
+_ROLE_TO_MSG = {
+    "user": HumanMessage,
+    "assistant": AIMessage,
+    "system": SystemMessage,
+}
 
 
 class BaseAIService(ABC):
@@ -25,6 +144,29 @@ class BaseAIService(ABC):
         """
         pass
 
+    async def chat_many(
+        self,
+        messages: list[tuple[str, Optional[list]]],
+        concurrency: int = 8
+    ) -> list[str]:
+        """
+        Run several chats concurrently and collect each full response.
+
+        Args:
+            messages: (message, history) pairs
+            concurrency: Maximum number of chats in flight at once
+
+        Returns:
+            Full responses, in the same order as messages
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def _one(message: str, history: Optional[list]) -> str:
+            async with semaphore:
+                return "".join([chunk async for chunk in self.chat(message, history)])
+
+        return await asyncio.gather(*(_one(m, h) for m, h in messages))
+
 
 class LangGraphService(BaseAIService):
     """LangGraph agent service"""
@@ -42,7 +184,8 @@ class LangGraphService(BaseAIService):
             llm = ChatOpenAI(
                 api_key=api_key,
                 model=model or "gpt-4-turbo-preview",
-                streaming=True
+                streaming=True,
+                http_async_client=_HTTP_CLIENT
             )
         else:  # anthropic
             llm = ChatAnthropic(
@@ -54,40 +197,44 @@ class LangGraphService(BaseAIService):
         # Create a simple agent (can be extended with tools)
         self.agent = create_react_agent(llm, tools=[])
 
+    @_coalesced
     async def chat(self, message: str, history: list = None) -> AsyncGenerator[str, None]:
         """Stream chat response"""
-        messages = []
-        if history:
-            for msg in history:
-                if msg["role"] == "user":
-                    messages.append(HumanMessage(content=msg["content"]))
-                elif msg["role"] == "assistant":
-                    messages.append(AIMessage(content=msg["content"]))
-                elif msg["role"] == "system":
-                    messages.append(SystemMessage(content=msg["content"]))
+        messages = [
+            _ROLE_TO_MSG[msg["role"]](content=msg["content"])
+            for msg in (history or [])
+            if msg["role"] in _ROLE_TO_MSG
+        ]
 
         messages.append(HumanMessage(content=message))
 
         async for event in self.agent.astream({"messages": messages}):
-            # Extract content from agent events
-            if "agent" in event and "messages" in event["agent"]:
-                for msg in event["agent"]["messages"]:
-                    if hasattr(msg, "content") and msg.content:
-                        yield msg.content
+            # Extract content from agent events (always BaseMessage instances)
+            agent = event.get("agent")
+            agent_msgs = agent and agent.get("messages")
+            for msg in agent_msgs or ():
+                content = msg.content
+                if content:
+                    yield content
 
 
 class OpenAIDirectService(BaseAIService):
     """Direct OpenAI API service"""
 
     def __init__(self, api_key: str, model: str = "gpt-4-turbo-preview"):
-        from openai import AsyncOpenAI
-        self.client = AsyncOpenAI(api_key=api_key)
+        self.client = AsyncOpenAI(api_key=api_key, http_client=_HTTP_CLIENT)
         self.model = model
 
+    @staticmethod
+    def _build_messages(message: str, history: Optional[list]) -> list:
+        """Request messages for a chat turn"""
+        # Build a new list; appending to history would mutate the caller's list
+        return [*history, {"role": "user", "content": message}] if history else [{"role": "user", "content": message}]
+
+    @_coalesced
     async def chat(self, message: str, history: list = None) -> AsyncGenerator[str, None]:
         """Stream chat response"""
-        messages = history or []
-        messages.append({"role": "user", "content": message})
+        messages = self._build_messages(message, history)
 
         stream = await self.client.chat.completions.create(
             model=self.model,
@@ -96,26 +243,101 @@ class OpenAIDirectService(BaseAIService):
         )
 
         async for chunk in stream:
-            if chunk.choices[0].delta.content:
-                yield chunk.choices[0].delta.content
+            # Look the delta up once per token
+            content = chunk.choices[0].delta.content
+            if content:
+                yield content
+
+    async def chat_batch(
+        self,
+        prompts: list[str],
+        history_list: Optional[list[Optional[list]]] = None,
+        poll_interval: float = 5.0,
+        max_poll_interval: float = 300.0
+    ) -> list[str]:
+        """
+        Run non-interactive chats through the OpenAI Batch API.
+
+        Batches are billed at a discount but complete asynchronously (24h
+        window), so this is meant for offline work such as bulk evaluation
+        or tagging, not for user-facing chat.
+
+        Args:
+            prompts: User messages
+            history_list: Optional history for each prompt (same order)
+            poll_interval: First delay between status checks, doubled up to
+                max_poll_interval
+
+        Returns:
+            Responses aligned with prompts ("" for requests that failed)
+
+        Raises:
+            ValueError: If history_list and prompts differ in length
+            RuntimeError: If the batch fails, expires or is cancelled
+        """
+        if history_list is not None and len(history_list) != len(prompts):
+            raise ValueError(
+                f"history_list has {len(history_list)} entries for {len(prompts)} prompts"
+            )
+        histories = history_list or [None] * len(prompts)
+        lines = [
+            json.dumps({
+                "custom_id": str(i),
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": {"model": self.model, "messages": self._build_messages(prompt, history)},
+            })
+            for i, (prompt, history) in enumerate(zip(prompts, histories))
+        ]
+
+        input_file = await self.client.files.create(
+            file=("batch.jsonl", "\n".join(lines).encode()),
+            purpose="batch"
+        )
+        batch = await self.client.batches.create(
+            input_file_id=input_file.id,
+            endpoint="/v1/chat/completions",
+            completion_window="24h"
+        )
+
+        # Poll with exponential backoff until the batch reaches a final state
+        delay = poll_interval
+        while batch.status not in ("completed", "failed", "expired", "cancelled"):
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, max_poll_interval)
+            batch = await self.client.batches.retrieve(batch.id)
+
+        if batch.status != "completed":
+            raise RuntimeError(f"OpenAI batch {batch.id} ended with status {batch.status}")
+
+        results = [""] * len(prompts)
+        if batch.output_file_id:
+            output = await self.client.files.content(batch.output_file_id)
+            for line in output.text.splitlines():
+                item = json.loads(line)
+                response = item.get("response") or {}
+                if response.get("status_code") == 200:
+                    content = response["body"]["choices"][0]["message"]["content"]
+                    results[int(item["custom_id"])] = content or ""
+        return results
 
 
 class AnthropicDirectService(BaseAIService):
     """Direct Anthropic API service"""
 
     def __init__(self, api_key: str, model: str = "claude-3-5-sonnet-20241022"):
-        from anthropic import AsyncAnthropic
-        self.client = AsyncAnthropic(api_key=api_key)
+        self.client = AsyncAnthropic(api_key=api_key, http_client=_HTTP_CLIENT)
         self.model = model
 
+    @_coalesced
     async def chat(self, message: str, history: list = None) -> AsyncGenerator[str, None]:
         """Stream chat response"""
-        # Convert history to Anthropic format
-        messages = []
-        if history:
-            for msg in history:
-                if msg["role"] in ["user", "assistant"]:
-                    messages.append({"role": msg["role"], "content": msg["content"]})
+        # History entries are already {"role", "content"} dicts, so they are
+        # passed through as-is; only system messages are dropped
+        messages = [
+            msg for msg in (history or [])
+            if msg["role"] in ("user", "assistant")
+        ]
 
         messages.append({"role": "user", "content": message})
 
@@ -128,6 +350,115 @@ class AnthropicDirectService(BaseAIService):
                 yield text
 
 
+class CachingAIService(BaseAIService):
+    """
+    Semantic response cache in front of another AI service.
+
+    First-turn messages (no history) are embedded with the OpenAI embeddings
+    API; when a previous prompt is similar enough (cosine similarity >=
+    threshold) its response is replayed instead of calling the LLM. Messages
+    with history always go to the wrapped service, since a cached answer
+    would ignore the conversation context.
+    """
+
+    def __init__(
+        self,
+        inner: BaseAIService,
+        api_key: str,
+        threshold: float = 0.95,
+        max_entries: int = 1024,
+        embedding_model: str = "text-embedding-3-small"
+    ):
+        self.inner = inner
+        self.client = AsyncOpenAI(api_key=api_key, http_client=_HTTP_CLIENT)
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.embedding_model = embedding_model
+
+        # Ring buffer of normalized prompt embeddings and their responses
+        self._vectors: Optional[np.ndarray] = None
+        self._responses: list[Optional[str]] = [None] * max_entries
+        self._size = 0
+        self._next = 0
+
+    async def _embed(self, text: str) -> np.ndarray:
+        """Embed text as a unit-length vector"""
+        response = await self.client.embeddings.create(model=self.embedding_model, input=text)
+        vector = np.asarray(response.data[0].embedding, dtype=np.float32)
+        return vector / np.linalg.norm(vector)
+
+    def _lookup(self, vector: np.ndarray) -> Optional[str]:
+        """Return the cached response of the most similar prompt, if close enough"""
+        if not self._size:
+            return None
+        scores = self._vectors[:self._size] @ vector
+        best = int(scores.argmax())
+        return self._responses[best] if scores[best] >= self.threshold else None
+
+    def _store(self, vector: np.ndarray, response: str) -> None:
+        """Cache a response, evicting the oldest entry when full"""
+        if self._vectors is None:
+            self._vectors = np.zeros((self.max_entries, vector.shape[0]), dtype=np.float32)
+        self._vectors[self._next] = vector
+        self._responses[self._next] = response
+        self._next = (self._next + 1) % self.max_entries
+        self._size = min(self._size + 1, self.max_entries)
+
+    async def chat(self, message: str, history: list = None) -> AsyncGenerator[str, None]:
+        """Stream chat response, replaying a cached one for similar prompts"""
+        vector = None
+        if not history:
+            try:
+                vector = await self._embed(message)
+            except Exception:
+                vector = None  # The cache must never break the chat itself
+
+        if vector is not None:
+            cached = self._lookup(vector)
+            if cached is not None:
+                yield cached
+                return
+
+        parts = []
+        async for chunk in self.inner.chat(message, history):
+            parts.append(chunk)
+            yield chunk
+
+        if vector is not None:
+            self._store(vector, "".join(parts))
+
+
+def _build_langgraph(api_key: str, provider: str, model: Optional[str]) -> BaseAIService:
+    return LangGraphService(api_key, provider, model)
+
+
+def _build_openai_direct(api_key: str, provider: str, model: Optional[str]) -> BaseAIService:
+    if provider != "openai":
+        raise ValueError("openai_direct agent requires openai provider")
+    return OpenAIDirectService(api_key, model or "gpt-4-turbo-preview")
+
+
+def _build_anthropic_direct(api_key: str, provider: str, model: Optional[str]) -> BaseAIService:
+    if provider != "anthropic":
+        raise ValueError("anthropic_direct agent requires anthropic provider")
+    return AnthropicDirectService(api_key, model or "claude-3-5-sonnet-20241022")
+
+
+# agent_type -> builder; register new agents here
+_FACTORIES = {
+    "langgraph": _build_langgraph,
+    "openai_direct": _build_openai_direct,
+    "anthropic_direct": _build_anthropic_direct,
+}
+
+# Service instances reused across requests (clients keep their connection
+# pools warm, LangGraph agents stay compiled). Keyed by a hash of the API key
+# so the cache keys don't hold plaintext keys.
+_service_cache: LRUCache = LRUCache(maxsize=256)
+# Keys are also evicted from sync routes (threadpool), so guard the cache
+_service_cache_lock = threading.Lock()
+
+
 class AgentFactory:
     """Factory to create AI service instances based on agent type and provider"""
 
@@ -136,16 +467,22 @@ class AgentFactory:
         agent_type: str,
         provider: str,
         api_key: str,
-        model: Optional[str] = None
+        model: Optional[str] = None,
+        cache_responses: bool = False
     ) -> BaseAIService:
         """
         Create an AI service instance.
 
+        Instances are cached per (agent_type, provider, api_key, model) and
+        shared between requests, so services must not keep per-chat state.
+
         Args:
             agent_type: Type of agent ("langgraph", "openai_direct", "anthropic_direct")
             provider: Provider ("openai" or "anthropic")
             api_key: Decrypted API key
             model: Optional model override
+            cache_responses: Wrap the service in a CachingAIService
+                (openai provider only, as it needs the embeddings API)
 
         Returns:
             AI service instance
@@ -153,21 +490,44 @@ class AgentFactory:
         Raises:
             ValueError: If agent_type is not supported
         """
-        if agent_type == "langgraph":
-            return LangGraphService(api_key, provider, model)
+        cache_key = (
+            agent_type, provider, hashlib.sha256(api_key.encode()).hexdigest(), model, cache_responses
+        )
+        with _service_cache_lock:
+            service = _service_cache.get(cache_key)
+        if service is None:
+            service = AgentFactory._build(agent_type, provider, api_key, model)
+            if cache_responses and provider == "openai":
+                service = CachingAIService(service, api_key)
+            with _service_cache_lock:
+                _service_cache[cache_key] = service
+        return service
 
-        elif agent_type == "openai_direct":
-            if provider != "openai":
-                raise ValueError("openai_direct agent requires openai provider")
-            return OpenAIDirectService(api_key, model or "gpt-4-turbo-preview")
+    @staticmethod
+    def evict(api_key: str) -> None:
+        """
+        Drop the cached services built with an API key.
 
-        elif agent_type == "anthropic_direct":
-            if provider != "anthropic":
-                raise ValueError("anthropic_direct agent requires anthropic provider")
-            return AnthropicDirectService(api_key, model or "claude-3-5-sonnet-20241022")
+        Call when a key is replaced or deleted, so its clients (and the
+        plaintext key they hold) don't stay in memory.
+        """
+        key_hash = hashlib.sha256(api_key.encode()).hexdigest()
+        with _service_cache_lock:
+            for cache_key in [k for k in _service_cache if k[2] == key_hash]:
+                del _service_cache[cache_key]
 
-        else:
+    @staticmethod
+    def _build(
+        agent_type: str,
+        provider: str,
+        api_key: str,
+        model: Optional[str] = None
+    ) -> BaseAIService:
+        """Build a new AI service instance (see create)"""
+        factory = _FACTORIES.get(agent_type)
+        if factory is None:
             raise ValueError(
                 f"Unknown agent_type: {agent_type}. "
-                f"Supported: langgraph, openai_direct, anthropic_direct"
+                f"Supported: {', '.join(_FACTORIES)}"
             )
+        return factory(api_key, provider, model)
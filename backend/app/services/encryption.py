@@ -1,15 +1,24 @@
-"""API key encryption and decryption using Fernet (symmetric encryption)"""
+"""API key encryption and decryption using Fernet (symmetric encryption)
+
+Encryption runs on rfernet (Rust implementation); its tokens are standard
+Fernet tokens, interchangeable with cryptography.fernet.
+"""
 from cryptography.fernet import Fernet
-import base64
+import functools
+import rfernet
 
 from app.config import settings
 
 
-def _get_fernet() -> Fernet:
+def _get_fernet() -> rfernet.Fernet:
     """Get Fernet cipher instance from encryption key"""
     # Ensure the key is properly formatted (32 bytes base64-encoded)
-    key = settings.ENCRYPTION_KEY.encode() if isinstance(settings.ENCRYPTION_KEY, str) else settings.ENCRYPTION_KEY
-    return Fernet(key)
+    key = settings.ENCRYPTION_KEY.decode() if isinstance(settings.ENCRYPTION_KEY, bytes) else settings.ENCRYPTION_KEY
+    return rfernet.Fernet(key)
+
+
+# Cipher built once at import and shared by all calls
+_FERNET = _get_fernet()
 
 
 def encrypt_api_key(api_key: str) -> str:
@@ -22,15 +31,19 @@ def encrypt_api_key(api_key: str) -> str:
     Returns:
         Encrypted string safe for database storage
     """
-    fernet = _get_fernet()
-    encrypted_bytes = fernet.encrypt(api_key.encode())
-    return encrypted_bytes.decode()
+    # rfernet returns the token as str already
+    return _FERNET.encrypt(api_key.encode())
 
 
+@functools.lru_cache(maxsize=1024)
 def decrypt_api_key(encrypted_key: str) -> str:
     """
     Decrypt an API key from database.
 
+    Results are memoized by ciphertext (in process memory only); a rotated
+    key has a new ciphertext, and decrypt_api_key.cache_clear() drops the
+    old plaintexts.
+
     Args:
         encrypted_key: The encrypted key from database
 
@@ -38,10 +51,9 @@ def decrypt_api_key(encrypted_key: str) -> str:
         The original plain API key
 
     Raises:
-        cryptography.fernet.InvalidToken: If decryption fails
+        rfernet.DecryptionError: If decryption fails
     """
-    fernet = _get_fernet()
-    decrypted_bytes = fernet.decrypt(encrypted_key.encode())
+    decrypted_bytes = _FERNET.decrypt(encrypted_key)
     return decrypted_bytes.decode()
 
 
@@ -0,0 +1,131 @@
+"""Test fixtures: the app running against a throwaway SQLite database"""
+import base64
+import os
+from typing import AsyncGenerator
+
+# Settings are read at import time, so these must be set before importing app
+os.environ.setdefault("MYSQL_PASSWORD", "test")
+os.environ.setdefault("SECRET_KEY", "test-secret-key-with-at-least-32-chars")
+os.environ.setdefault("ENCRYPTION_KEY", base64.urlsafe_b64encode(b"0" * 32).decode())
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base, get_db, get_async_db, get_ro_conn
+from app.main import app
+from app.rate_limit import limiter
+from app.models import User, Conversation, ApiKey, ProviderEnum
+from app.routes import auth, chat
+from app.services.ai_service import BaseAIService
+from app.services.encryption import encrypt_api_key, decrypt_api_key
+
+
+class EchoService(BaseAIService):
+    """AI service stand-in streaming a fixed reply"""
+
+    async def chat(self, message: str, history: list = None) -> AsyncGenerator[str, None]:
+        for chunk in ("Hello", " world"):
+            yield chunk
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return tmp_path / "test.db"
+
+
+@pytest.fixture
+def session_factory(db_path):
+    """Sync session factory bound to a fresh database"""
+    engine = create_engine(f"sqlite:///{db_path}")
+    Base.metadata.create_all(bind=engine)
+    yield sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    engine.dispose()
+
+
+@pytest.fixture
+def client(db_path, session_factory, monkeypatch):
+    """TestClient with every database dependency pointed at the test database"""
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{db_path}")
+    async_session_factory = async_sessionmaker(
+        bind=async_engine,
+        autoflush=False,
+        expire_on_commit=False
+    )
+
+    def _get_db():
+        db = session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    def _get_ro_conn():
+        with session_factory.kw["bind"].connect() as conn:
+            yield conn
+
+    async def _get_async_db():
+        async with async_session_factory() as db:
+            yield db
+
+    app.dependency_overrides[get_db] = _get_db
+    app.dependency_overrides[get_ro_conn] = _get_ro_conn
+    app.dependency_overrides[get_async_db] = _get_async_db
+    # The stream generator opens its own session
+    monkeypatch.setattr(chat, "AsyncSessionLocal", async_session_factory)
+    monkeypatch.setattr(limiter, "enabled", False)
+
+    # Not used as a context manager, so startup/shutdown hooks don't run
+    # against the real database
+    yield TestClient(app)
+
+    app.dependency_overrides.clear()
+    auth._token_cache.clear()
+    auth._user_cache.clear()
+    decrypt_api_key.cache_clear()
+
+
+@pytest.fixture
+def user(session_factory):
+    with session_factory() as db:
+        user = User(email="user@example.com", name="User", hashed_password="unused")
+        db.add(user)
+        db.commit()
+        db.refresh(user)
+        db.expunge(user)
+    return user
+
+
+@pytest.fixture
+def auth_headers(user):
+    return {"Authorization": f"Bearer {auth.create_access_token(user.id)}"}
+
+
+@pytest.fixture
+def conversation(session_factory, user):
+    """An openai_direct conversation whose user has an OpenAI key"""
+    with session_factory() as db:
+        db.add(ApiKey(
+            user_id=user.id,
+            provider=ProviderEnum.OPENAI,
+            encrypted_key=encrypt_api_key("sk-test")
+        ))
+        conversation = Conversation(
+            user_id=user.id,
+            title="Test",
+            agent_type="openai_direct",
+            provider=ProviderEnum.OPENAI
+        )
+        db.add(conversation)
+        db.commit()
+        db.refresh(conversation)
+        db.expunge(conversation)
+    return conversation
+
+
+@pytest.fixture
+def echo_service(monkeypatch):
+    """Make the chat routes use EchoService instead of a real provider"""
+    monkeypatch.setattr(chat.AgentFactory, "create", staticmethod(lambda **kwargs: EchoService()))
@@ -0,0 +1,303 @@
+"""AI service tests against a mocked provider transport"""
+import asyncio
+import contextvars
+import json
+from types import SimpleNamespace
+
+import httpx
+import pytest
+
+from app.services import ai_service
+from app.services.ai_service import LangGraphService
+
+
+def _openai_stream(text: str) -> bytes:
+    """Chat completions SSE body streaming text as one chunk"""
+    chunks = [
+        {"delta": {"role": "assistant", "content": text}, "finish_reason": None},
+        {"delta": {}, "finish_reason": "stop"},
+    ]
+    lines = [
+        "data: " + json.dumps({
+            "id": "chatcmpl-test",
+            "object": "chat.completion.chunk",
+            "created": 0,
+            "model": "gpt-test",
+            "choices": [{"index": 0, **chunk}],
+        })
+        for chunk in chunks
+    ]
+    return ("\n\n".join(lines + ["data: [DONE]"]) + "\n\n").encode()
+
+
+@pytest.fixture
+def openai_requests(monkeypatch):
+    """Requests sent through the shared HTTP client, answered with a canned stream"""
+    requests: list[httpx.Request] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        return httpx.Response(
+            200,
+            content=_openai_stream("Hi"),
+            headers={"content-type": "text/event-stream"}
+        )
+
+    monkeypatch.setattr(ai_service, "_HTTP_CLIENT", httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    return requests
+
+
+def test_langgraph_openai_sends_each_services_key(openai_requests):
+    services = [LangGraphService(key, provider="openai") for key in ("sk-one", "sk-two")]
+
+    async def run():
+        return [
+            "".join([chunk async for chunk in service.chat("Hello")])
+            for service in services
+        ]
+
+    assert asyncio.run(run()) == ["Hi", "Hi"]
+    assert [request.headers["authorization"] for request in openai_requests] == [
+        "Bearer sk-one",
+        "Bearer sk-two",
+    ]
+
+
+def test_coalesce_flushes_buffered_chunks_after_max_ms():
+    async def source():
+        yield "Hel"
+        yield "lo"
+        await asyncio.sleep(0.5)  # Stall with "lo" still buffered
+        yield " world"
+
+    async def run():
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        return [(chunk, loop.time() - start) async for chunk in ai_service._coalesce(source(), max_ms=20)]
+
+    received = asyncio.run(run())
+    assert "".join(chunk for chunk, _ in received) == "Hello world"
+    # Everything but " world" goes out well before the stall ends
+    assert all(elapsed < 0.2 for chunk, elapsed in received if chunk != " world")
+
+
+def test_coalesce_batches_bursts():
+    async def source():
+        for _ in range(10):
+            yield "ab"
+
+    async def run():
+        return [chunk async for chunk in ai_service._coalesce(source(), max_ms=1000, max_chars=8)]
+
+    assert asyncio.run(run()) == ["abababab", "abababab", "abab"]
+
+
+def test_coalesce_yields_buffered_chunks_before_error():
+    async def source():
+        yield "partial"
+        raise RuntimeError("upstream failed")
+
+    async def run():
+        received = []
+        with pytest.raises(RuntimeError):
+            async for chunk in ai_service._coalesce(source(), max_ms=1000):
+                received.append(chunk)
+        return received
+
+    assert asyncio.run(run()) == ["partial"]
+
+
+def test_coalesce_keeps_the_streams_context():
+    var: contextvars.ContextVar[str] = contextvars.ContextVar("var", default="unset")
+
+    async def source():
+        var.set("set")  # e.g. a tracing callback context
+        yield "a"
+        yield var.get()
+        yield var.get()
+
+    async def run():
+        return "".join([chunk async for chunk in ai_service._coalesce(source(), max_ms=1000)])
+
+    assert asyncio.run(run()) == "asetset"
+
+
+class _CountingService(ai_service.BaseAIService):
+    """Wrapped service answering each message with its own reply"""
+
+    def __init__(self):
+        self.calls: list[str] = []
+
+    async def chat(self, message: str, history: list = None):
+        self.calls.append(message)
+        yield f"reply to {message}"
+
+
+class _StubEmbeddings:
+    """Embeddings endpoint returning canned vectors, or failing when told to"""
+
+    def __init__(self, vectors: dict[str, list[float]]):
+        self.vectors = vectors
+        self.fail = False
+
+    async def create(self, model: str, input: str):
+        if self.fail:
+            raise httpx.ConnectError("embeddings unavailable")
+        return SimpleNamespace(data=[SimpleNamespace(embedding=self.vectors[input])])
+
+
+@pytest.fixture
+def caching_service():
+    """CachingAIService over a counting service, embedding via a stub client"""
+    inner = _CountingService()
+    service = ai_service.CachingAIService(inner, "sk-test", max_entries=2)
+    embeddings = _StubEmbeddings({
+        "hi": [1.0, 0.0, 0.0],
+        "hi!": [0.99, 0.01, 0.0],  # Close enough to "hi"
+        "bye": [0.0, 1.0, 0.0],
+        "why": [0.0, 0.0, 1.0],
+    })
+    service.client = SimpleNamespace(embeddings=embeddings)
+    return service, inner, embeddings
+
+
+def _ask(service, message: str, history: list = None) -> str:
+    async def run():
+        return "".join([chunk async for chunk in service.chat(message, history)])
+
+    return asyncio.run(run())
+
+
+def test_caching_service_replays_similar_prompts(caching_service):
+    service, inner, _ = caching_service
+
+    assert _ask(service, "hi") == "reply to hi"
+    assert _ask(service, "hi!") == "reply to hi"
+    assert inner.calls == ["hi"]
+
+
+def test_caching_service_misses_dissimilar_prompts(caching_service):
+    service, inner, _ = caching_service
+
+    assert _ask(service, "hi") == "reply to hi"
+    assert _ask(service, "bye") == "reply to bye"
+    assert inner.calls == ["hi", "bye"]
+
+
+def test_caching_service_evicts_oldest_entry_when_full(caching_service):
+    service, inner, _ = caching_service
+
+    for message in ("hi", "bye", "why"):  # max_entries=2: "why" replaces "hi"
+        _ask(service, message)
+    inner.calls.clear()
+
+    assert _ask(service, "bye") == "reply to bye"
+    assert _ask(service, "why") == "reply to why"
+    assert inner.calls == []
+    assert _ask(service, "hi") == "reply to hi"
+    assert inner.calls == ["hi"]
+
+
+def test_caching_service_falls_through_when_embeddings_fail(caching_service):
+    service, inner, embeddings = caching_service
+    _ask(service, "hi")
+    embeddings.fail = True
+
+    assert _ask(service, "hi") == "reply to hi"
+    assert inner.calls == ["hi", "hi"]
+
+    # Nothing is stored without an embedding
+    embeddings.fail = False
+    assert service._size == 1
+
+
+def test_caching_service_skips_cache_with_history(caching_service):
+    service, inner, _ = caching_service
+    _ask(service, "hi")
+
+    history = [{"role": "user", "content": "earlier"}]
+    assert _ask(service, "hi", history) == "reply to hi"
+    assert inner.calls == ["hi", "hi"]
+
+
+@pytest.fixture
+def batch_api(monkeypatch):
+    """Fake Batch API: one in-progress poll, then results written out of order"""
+    requests: list[httpx.Request] = []
+    uploads: list[bytes] = []
+    polls = {"count": 0}
+
+    def batch(status: str, **fields) -> dict:
+        return {
+            "id": "batch_1", "object": "batch", "endpoint": "/v1/chat/completions",
+            "input_file_id": "file_in", "completion_window": "24h", "created_at": 0,
+            "status": status, **fields
+        }
+
+    def result(custom_id: str, content: str) -> dict:
+        return {"custom_id": custom_id, "response": {
+            "status_code": 200,
+            "body": {"choices": [{"index": 0, "message": {"role": "assistant", "content": content}}]}
+        }}
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        route = (request.method, request.url.path)
+        if route == ("POST", "/v1/files"):
+            uploads.append(request.read())
+            return httpx.Response(200, json={
+                "id": "file_in", "object": "file", "bytes": 0, "created_at": 0,
+                "filename": "batch.jsonl", "purpose": "batch", "status": "processed"
+            })
+        if route == ("POST", "/v1/batches"):
+            return httpx.Response(200, json=batch("validating"))
+        if route == ("GET", "/v1/batches/batch_1"):
+            polls["count"] += 1
+            if polls["count"] == 1:
+                return httpx.Response(200, json=batch("in_progress"))
+            return httpx.Response(200, json=batch("completed", output_file_id="file_out"))
+        if route == ("GET", "/v1/files/file_out/content"):
+            lines = [
+                result("2", "third"),
+                {"custom_id": "1", "response": {"status_code": 500, "body": {}}},
+                result("0", "first"),
+            ]
+            return httpx.Response(200, text="\n".join(json.dumps(line) for line in lines))
+        return httpx.Response(404)
+
+    monkeypatch.setattr(ai_service, "_HTTP_CLIENT", httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    return requests, uploads
+
+
+def test_chat_batch_uploads_polls_and_aligns_results(batch_api):
+    requests, uploads = batch_api
+    service = ai_service.OpenAIDirectService("sk-test", "gpt-test")
+    history = [{"role": "assistant", "content": "Earlier"}]
+
+    results = asyncio.run(service.chat_batch(
+        ["a", "b", "c"], [None, history, None], poll_interval=0.001
+    ))
+
+    assert results == ["first", "", "third"]
+    assert [(r.method, r.url.path) for r in requests] == [
+        ("POST", "/v1/files"),
+        ("POST", "/v1/batches"),
+        ("GET", "/v1/batches/batch_1"),
+        ("GET", "/v1/batches/batch_1"),
+        ("GET", "/v1/files/file_out/content"),
+    ]
+    assert json.loads(requests[1].content)["input_file_id"] == "file_in"
+
+    # One request line per prompt, carrying its own history
+    upload = uploads[0]
+    lines = [json.loads(line) for line in upload[upload.index(b"{"):upload.rindex(b"}") + 1].splitlines()]
+    assert [line["custom_id"] for line in lines] == ["0", "1", "2"]
+    assert lines[1]["body"]["messages"] == [*history, {"role": "user", "content": "b"}]
+    assert lines[2]["body"]["messages"] == [{"role": "user", "content": "c"}]
+
+
+def test_chat_batch_rejects_mismatched_histories():
+    service = ai_service.OpenAIDirectService("sk-test", "gpt-test")
+
+    with pytest.raises(ValueError):
+        asyncio.run(service.chat_batch(["a", "b"], [None]))
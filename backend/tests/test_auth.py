@@ -0,0 +1,66 @@
+"""API key management"""
+import hashlib
+
+import pytest
+
+from app.models import ApiKey, ProviderEnum
+from app.services import ai_service
+from app.services.ai_service import AgentFactory
+
+
+@pytest.fixture
+def cached_service_keys():
+    """Hashed API keys of the cached services"""
+    ai_service._service_cache.clear()
+    yield lambda: {cache_key[2] for cache_key in ai_service._service_cache}
+    ai_service._service_cache.clear()
+
+
+def _add_key(client, auth_headers, api_key):
+    response = client.post(
+        "/auth/api-keys",
+        json={"provider": "openai", "api_key": api_key},
+        headers=auth_headers
+    )
+    assert response.status_code == 201, response.text
+
+
+def test_replacing_a_key_evicts_its_services(client, auth_headers, cached_service_keys):
+    _add_key(client, auth_headers, "sk-old")
+    AgentFactory.create("openai_direct", "openai", "sk-old")
+    AgentFactory.create("openai_direct", "openai", "sk-other")
+    assert len(cached_service_keys()) == 2
+
+    _add_key(client, auth_headers, "sk-new")
+
+    # Only the replaced key's services are dropped
+    assert cached_service_keys() == {hashlib.sha256(b"sk-other").hexdigest()}
+
+
+def test_deleting_a_key_evicts_its_services(client, auth_headers, cached_service_keys):
+    _add_key(client, auth_headers, "sk-old")
+    AgentFactory.create("openai_direct", "openai", "sk-old")
+
+    response = client.delete("/auth/api-keys/openai", headers=auth_headers)
+    assert response.status_code == 204
+
+    assert not cached_service_keys()
+
+
+@pytest.fixture
+def undecryptable_key(session_factory, user):
+    """A stored OpenAI key whose ciphertext no longer decrypts"""
+    with session_factory() as db:
+        db.add(ApiKey(user_id=user.id, provider=ProviderEnum.OPENAI, encrypted_key="not-a-fernet-token"))
+        db.commit()
+
+
+@pytest.mark.usefixtures("undecryptable_key")
+def test_undecryptable_key_can_be_replaced(client, auth_headers):
+    _add_key(client, auth_headers, "sk-new")
+
+
+@pytest.mark.usefixtures("undecryptable_key")
+def test_undecryptable_key_can_be_deleted(client, auth_headers):
+    response = client.delete("/auth/api-keys/openai", headers=auth_headers)
+    assert response.status_code == 204
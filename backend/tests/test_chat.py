@@ -0,0 +1,116 @@
+"""Chat turn persistence"""
+import asyncio
+import json
+from typing import AsyncGenerator
+
+import pytest
+from sqlalchemy import select
+
+from app.main import app
+from app.models import Message
+from app.routes import chat
+from app.services.ai_service import BaseAIService
+
+
+class _StallingService(BaseAIService):
+    """AI service stand-in that sends one chunk, then never finishes"""
+
+    def __init__(self):
+        self.started = asyncio.Event()
+
+    async def chat(self, message: str, history: list = None) -> AsyncGenerator[str, None]:
+        self.started.set()
+        yield "Hello"
+        await asyncio.sleep(60)
+        yield " world"
+
+
+@pytest.fixture
+def stalling_service(monkeypatch):
+    service = _StallingService()
+    monkeypatch.setattr(chat.AgentFactory, "create", staticmethod(lambda **kwargs: service))
+    return service
+
+
+def _scope(path: str, headers: dict) -> dict:
+    """ASGI scope of a JSON POST request"""
+    return {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "POST",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "root_path": "",
+        "headers": [
+            (b"content-type", b"application/json"),
+            *((name.lower().encode(), value.encode()) for name, value in headers.items()),
+        ],
+        "client": ("127.0.0.1", 50000),
+        "server": ("testserver", 80),
+    }
+
+
+async def _stream_until_first_event(headers: dict, body: dict) -> None:
+    """Call /chat/stream over ASGI and disconnect after the first SSE event"""
+    first_event = asyncio.Event()
+    request_sent = False
+
+    async def receive():
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {"type": "http.request", "body": json.dumps(body).encode(), "more_body": False}
+        await first_event.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.body" and message.get("body"):
+            first_event.set()
+
+    await asyncio.wait_for(app(_scope("/chat/stream", headers), receive, send), timeout=5)
+
+
+async def _cancel_message_while_generating(service: _StallingService, headers: dict, body: dict) -> None:
+    """Call /chat/message over ASGI and cancel it while the reply is generated"""
+    async def receive():
+        return {"type": "http.request", "body": json.dumps(body).encode(), "more_body": False}
+
+    async def send(message):
+        pass
+
+    request = asyncio.create_task(app(_scope("/chat/message", headers), receive, send))
+    await asyncio.wait_for(service.started.wait(), timeout=5)
+    request.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await request
+
+
+def _saved_messages(session_factory, conversation_id: int) -> list[tuple[str, str]]:
+    with session_factory() as db:
+        rows = db.execute(
+            select(Message.role, Message.content).where(Message.conversation_id == conversation_id)
+        ).all()
+    return [tuple(row) for row in rows]
+
+
+@pytest.mark.usefixtures("client", "stalling_service")
+def test_stream_disconnect_still_saves_user_message(session_factory, auth_headers, conversation):
+    asyncio.run(_stream_until_first_event(
+        auth_headers, {"conversation_id": conversation.id, "message": "Hi"}
+    ))
+
+    assert _saved_messages(session_factory, conversation.id) == [("user", "Hi")]
+
+
+@pytest.mark.usefixtures("client")
+def test_cancelled_message_still_saves_user_message(
+    session_factory, auth_headers, conversation, stalling_service
+):
+    asyncio.run(_cancel_message_while_generating(
+        stalling_service, auth_headers, {"conversation_id": conversation.id, "message": "Hi"}
+    ))
+
+    assert _saved_messages(session_factory, conversation.id) == [("user", "Hi")]
@@ -0,0 +1,64 @@
+"""Conversation caching"""
+from datetime import datetime
+
+import pytest
+from sqlalchemy.dialects import mysql
+from sqlalchemy.schema import CreateTable
+
+from app.models import Conversation
+from app.routes import chat, conversations
+
+
+class _FrozenDatetime(datetime):
+    """Every chat turn gets the same timestamp, as within one MySQL DATETIME second"""
+
+    @classmethod
+    def utcnow(cls):
+        return datetime(2025, 1, 1, 12, 0, 0)
+
+
+@pytest.mark.usefixtures("echo_service")
+def test_list_etag_changes_with_each_chat_turn(client, auth_headers, conversation, monkeypatch):
+    monkeypatch.setattr(chat, "datetime", _FrozenDatetime)
+
+    etags = []
+    for _ in range(2):
+        client.post(
+            "/chat/message",
+            json={"conversation_id": conversation.id, "message": "Hi"},
+            headers=auth_headers
+        )
+        response = client.get("/conversations/", headers=auth_headers)
+        assert response.status_code == 200
+        etags.append(response.headers["etag"])
+
+    assert etags[0] != etags[1]
+    assert response.json()[0]["message_count"] == 4
+
+    response = client.get("/conversations/", headers={**auth_headers, "If-None-Match": etags[1]})
+    assert response.status_code == 304
+
+
+def test_conversation_etag_changes_on_rename_within_a_second(client, auth_headers, conversation, monkeypatch):
+    monkeypatch.setattr(conversations, "datetime", _FrozenDatetime)
+    # Unchanged updated_at values fall back to the column's onupdate
+    monkeypatch.setattr(
+        Conversation.__table__.c.updated_at.onupdate, "arg", lambda context: _FrozenDatetime.utcnow()
+    )
+
+    etags = []
+    for title in ("First", "Second"):
+        response = client.patch(
+            f"/conversations/{conversation.id}", params={"title": title}, headers=auth_headers
+        )
+        assert response.status_code == 200
+        response = client.get(f"/conversations/{conversation.id}", headers=auth_headers)
+        etags.append(response.headers["etag"])
+
+    assert etags[0] != etags[1]
+    assert response.json()["conversation"]["title"] == "Second"
+
+
+def test_updated_at_keeps_microseconds_on_mysql():
+    ddl = str(CreateTable(Conversation.__table__).compile(dialect=mysql.dialect()))
+    assert "updated_at DATETIME(6) NOT NULL" in ddl
@@ -0,0 +1,43 @@
+"""Endpoints guarded with raiseload("*") must not trigger lazy loads"""
+import pytest
+
+pytestmark = pytest.mark.usefixtures("echo_service")
+
+
+def _assert_no_lazy_load(response):
+    # A lazy load under raiseload raises InvalidRequestError (a 500)
+    assert "InvalidRequestError" not in response.text
+    assert response.status_code == 200, response.text
+
+
+def test_chat_message(client, auth_headers, conversation):
+    response = client.post(
+        "/chat/message",
+        json={"conversation_id": conversation.id, "message": "Hi"},
+        headers=auth_headers
+    )
+    _assert_no_lazy_load(response)
+    assert response.json()["message"] == "Hello world"
+
+
+def test_chat_stream(client, auth_headers, conversation):
+    response = client.post(
+        "/chat/stream",
+        json={"conversation_id": conversation.id, "message": "Hi"},
+        headers=auth_headers
+    )
+    _assert_no_lazy_load(response)
+    assert "data: [DONE]" in response.text
+
+
+def test_get_conversation(client, auth_headers, conversation):
+    # Send a turn first so the conversation has messages to serialize
+    client.post(
+        "/chat/message",
+        json={"conversation_id": conversation.id, "message": "Hi"},
+        headers=auth_headers
+    )
+
+    response = client.get(f"/conversations/{conversation.id}", headers=auth_headers)
+    _assert_no_lazy_load(response)
+    assert [msg["role"] for msg in response.json()["messages"]] == ["user", "assistant"]
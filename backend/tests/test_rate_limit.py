@@ -0,0 +1,48 @@
+"""Per-user rate limiting of the chat endpoints"""
+import pytest
+
+from app.rate_limit import limiter
+from app.routes import auth
+
+
+@pytest.fixture
+def chat_limit(client, monkeypatch):
+    """Enable the limiter with a fresh in-memory store"""
+    limiter.reset()
+    monkeypatch.setattr(limiter, "enabled", True)
+    yield
+    limiter.reset()
+
+
+@pytest.mark.usefixtures("chat_limit", "echo_service")
+def test_chat_limit_is_per_user_and_keyed_on_the_user_id(client, user, conversation, monkeypatch):
+    monkeypatch.setattr(auth.settings, "ACCESS_TOKEN_EXPIRE_MINUTES", 60)
+    storage_keys = []
+    hit = limiter._limiter.hit
+
+    def recording_hit(item, *identifiers, **kwargs):
+        storage_keys.append(item.key_for(*identifiers))
+        return hit(item, *identifiers, **kwargs)
+
+    monkeypatch.setattr(limiter._limiter, "hit", recording_hit)
+
+    # Two tokens for the same user share one budget
+    tokens = [auth.create_access_token(user.id), auth.jwt.encode(
+        {"sub": str(user.id), "exp": 4102444800}, auth.settings.SECRET_KEY, algorithm=auth.settings.ALGORITHM
+    )]
+    assert tokens[0] != tokens[1]
+
+    statuses = []
+    for i in range(auth.settings.RATE_LIMIT_PER_MINUTE + 1):
+        response = client.post(
+            "/chat/message",
+            json={"conversation_id": conversation.id, "message": "Hi"},
+            headers={"Authorization": f"Bearer {tokens[i % 2]}"}
+        )
+        statuses.append(response.status_code)
+
+    assert statuses[:-1] == [200] * auth.settings.RATE_LIMIT_PER_MINUTE
+    assert statuses[-1] == 429
+    # Storage keys carry the user id, never the token
+    assert all(f"user:{user.id}" in key for key in storage_keys)
+    assert not any(token in key for key in storage_keys for token in tokens)